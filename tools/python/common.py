@@ -8,92 +8,211 @@ import scriptcontext as sc
 import rhinoscriptsyntax as rs
 
 import ConfigParser
-import copy
+import math
+import os
+import pickle
+import re
 
 ###########
 #Gcode Class
 
-class Gcode:
+class Gcode(object):
 	"""Holds information about a gcode file"""
 	
-	def __init__(self):
-		"""initialize gcode"""
+	__slots__ = ('chunks', 'fp', 'feedRate', 'spindleSpeed')
+	
+	def __init__(self, fp=None):
+		"""initialize gcode
+			fp: open file to write gcode to as it is added, instead of keeping it
+		"""
 		
-		self.text = ''
+		#pieces of gcode text, in order. joined only when needed
+		self.chunks = []
+		self.fp = fp
 		self.feedRate = 0
 		self.spindleSpeed = 0
+	
+	def append(self, text):
+		"""add text to end of gcode"""
+		
+		if self.fp is None:
+			self.chunks.append(text)
+		else:
+			self.fp.write(text)
+	
+	@property
+	def text(self):
+		"""all gcode text"""
+		
+		return ''.join(self.chunks)
 
 
 ###########
 #Settings Class
 
-class Settings:
+class Settings(object):
 	"""Holds all global settings and sets defaults. Reads settings from file config"""
 	
+	__slots__ = ('main', 'display', 'pocket', 'gcode')
+	
+	configFile = 'config.cfg'
+	#parsed settings, reused while config file is unchanged
+	cacheFile = 'config.cache'
+	#increment when parsing changes, to invalidate old caches
+	cacheVersion = 3
+	sections = ['main', 'display', 'pocket', 'gcode']
+	
+	#same forms accepted by int() and float()
+	intPattern = re.compile(r'^[-+]?\d+$')
+	floatPattern = re.compile(r'^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$')
+	
 	def __init__(self):
 		"""Read in settings and define defaults"""
 		
+		mtime = os.stat(self.configFile).st_mtime
+		
+		values = self.readCache(mtime)
+		if values is None:
+			values = self.readConfig()
+			self.writeCache(mtime, values)
+		
+		self.main = values['main']
+		self.display = values['display']
+		self.pocket = values['pocket']
+		self.gcode = values['gcode']
+	
+	def readConfig(self):
+		"""Parse config file
+		
+			Returns: dictionary of settings dictionaries, by section
+		"""
+		
 		config = ConfigParser.ConfigParser(allow_no_value=True)
 		config.optionxform = str
 		
-		config.read('config.cfg')
+		config.read(self.configFile)
+		
+		values = {}
+		for section in self.sections:
+			values[section] = dict(config.items(section))
+			self.parseValues(values[section])
 		
-		#main
-		self.main = dict(config.items('main'))
-		self.parseValues(self.main)
+		#display settings are comma delimited lists
+		self.parseLists(values['display'])
 		
-		#display
-		self.display = dict(config.items('display'))
-		self.parseValues(self.display)
+		return values
+	
+	def readCache(self, mtime):
+		"""Load parsed settings, if cached from current version of config file
+		
+			Returns: dictionary of settings dictionaries, or None
+		"""
+		
+		try:
+			f = open(self.cacheFile, 'rb')
+		except IOError:
+			return None
+		
+		try:
+			cache = pickle.load(f)
+		except Exception:
+			return None
+		finally:
+			f.close()
 		
-		#pocket
-		self.pocket = dict(config.items('pocket'))
-		self.parseValues(self.pocket)
+		if cache.get('version') != self.cacheVersion or cache.get('mtime') != mtime:
+			return None
 		
-		#gcode
-		self.gcode = dict(config.items('gcode'))
-		self.parseValues(self.gcode)
+		return cache['values']
+	
+	def writeCache(self, mtime, values):
+		"""Save parsed settings for next run"""
+		
+		try:
+			f = open(self.cacheFile, 'wb')
+		except IOError:
+			#not fatal, just parse again next time
+			return
+		
+		pickle.dump({'version': self.cacheVersion, 'mtime': mtime, 'values': values}, f)
+		f.close()
 	
 	def parseValues(self, d):
+		"""convert numeric strings to int or float"""
+		
 		for key, value in d.iteritems():
-			try:
+			if value is None:
+				continue
+			if self.intPattern.match(value):
 				d[key] = int(value)
-			except ValueError:
-				try:
-					d[key] = float(value)
-				except ValueError:
-					d[key] = str(value)
+			elif self.floatPattern.match(value):
+				d[key] = float(value)
+	
+	def parseLists(self, d):
+		"""split comma delimited strings into tuples of names"""
+		
+		for key, value in d.iteritems():
+			names = str(value or '').split(',')
+			d[key] = tuple(n.strip() for n in names if n.strip())
 
 ###########
 #Functions
 
-def displayPlane(plane):
-	"""Add an aligned surface to the document centered on plane's origin"""
+def displayPlane(plane, transform=Rhino.Geometry.Transform.Identity):
+	"""Add an aligned surface to the document centered on plane's origin
+		transform: applied to plane before adding
+	
+	Returns: guid of added surface
+	"""
 	
-	newPlane = copy.copy(plane)
+	newPlane = Rhino.Geometry.Plane(plane)
+	newPlane.Transform(transform)
 	newPlane.Origin = newPlane.PointAt(-2,-2)
-	rs.AddPlaneSurface(newPlane, 4, 4)
+	return rs.AddPlaneSurface(newPlane, 4, 4)
+	
+def displayBoundingBox(bBox, local, plane=None, is2D=None,
+	transform=Rhino.Geometry.Transform.Identity):
+	"""Add boundingbox defined in `local` to document. If 2D, make rectangle on `plane`
+		is2D: True or False if already known, otherwise tested
+		transform: applied to global geometry before adding
+	
+	Returns: guid of added rectangle or box
+	"""
 	
-def displayBoundingBox(bBox, local, plane=None):
-	"""Add boundingbox defined in `local` to document. If 2D, make rectangle on `plane`"""
+	if plane is not None:
+		plane = Rhino.Geometry.Plane(plane)
+		plane.Transform(transform)
 	
 	#define transformation
-	transform = Rhino.Geometry.Transform.ChangeBasis(local, Rhino.Geometry.Plane.WorldXY)
+	transform = transform * Rhino.Geometry.Transform.ChangeBasis(local,
+		Rhino.Geometry.Plane.WorldXY)
 	
-	if bBox.IsDegenerate(.001):
-		#make copies of box corner points
-		min = copy.copy(bBox.Min); max = copy.copy(bBox.Max)
+	if is2D is None:
+		is2D = bBox.IsDegenerate(.001)
+	
+	if is2D:
 		#convert corner points to global coordinates
-		min.Transform(transform); max.Transform(transform)
+		min, max = transform.TransformList([bBox.Min, bBox.Max])
 		#create rectangle
 		rectangle = Rhino.Geometry.Rectangle3d(plane, min, max)
-		sc.doc.Objects.AddCurve(rectangle.ToNurbsCurve())
+		return sc.doc.Objects.AddCurve(rectangle.ToNurbsCurve())
 	else:
 		#convert to brep
 		brep = bBox.ToBrep()
 		#transform to global coordinates
 		brep.Transform(transform)
-		sc.doc.Objects.AddBrep(brep)
+		return sc.doc.Objects.AddBrep(brep)
+
+def transformPoints(transform, points):
+	"""Apply transform to a list of points, skipping the work for identity transforms
+	
+	Returns: list of transformed points - `points` itself if transform is identity
+	"""
+	
+	if transform.IsIdentity:
+		return points
+	
+	return transform.TransformList(points)
 
 def getObject(name):
 	"""Get reference to single Rhino object, checking for failure"""
@@ -105,7 +224,7 @@ def getObject(name):
 def printPoint3d(p):
 	"""format Point for printing"""
 	
-	return '(' + ', '.join([str(round(c,2)) for c in p]) + ')'
+	return "(%.2f, %.2f, %.2f)" % (p.X, p.Y, p.Z)
 
 def getBrep(ob):
 	"""Retrieve the brep for an object.
@@ -131,36 +250,111 @@ def findClosestPoints(l0, l1):
 		
 		"""
 		
-		intersection = Rhino.Geometry.Intersect.Intersection.LineLine(l0,
-			l1, 0, True)
+		t0, t1 = closestParameters(l0, l1)
 		
 		#start point is on first post's axis
-		fromP = l0.PointAt(intersection[1])
+		fromP = l0.PointAt(t0)
 		
 		#end point is on second post's axis
-		toP = l1.PointAt(intersection[2])
+		toP = l1.PointAt(t1)
 		
 		return [fromP, toP]
 
-def vectorAngle(vector1, vector2, orientation=Rhino.Geometry.Plane.WorldXY):
+def closestParameters(l0, l1):
+	"""Find the closest points between two line segments
+	
+	Returns: normalized parameters of closest points on l0 and l1
+	
+	"""
+	
+	#segment directions
+	d0 = (l0.ToX - l0.FromX, l0.ToY - l0.FromY, l0.ToZ - l0.FromZ)
+	d1 = (l1.ToX - l1.FromX, l1.ToY - l1.FromY, l1.ToZ - l1.FromZ)
+	#vector between start points
+	r = (l0.FromX - l1.FromX, l0.FromY - l1.FromY, l0.FromZ - l1.FromZ)
+	
+	a = d0[0]*d0[0] + d0[1]*d0[1] + d0[2]*d0[2]
+	e = d1[0]*d1[0] + d1[1]*d1[1] + d1[2]*d1[2]
+	f = d1[0]*r[0] + d1[1]*r[1] + d1[2]*r[2]
+	
+	if a == 0 and e == 0:
+		#both segments are points
+		return 0.0, 0.0
+	if a == 0:
+		#first segment is a point
+		return 0.0, clamp(f / e, 0, 1)
+	
+	c = d0[0]*r[0] + d0[1]*r[1] + d0[2]*r[2]
+	
+	if e == 0:
+		#second segment is a point
+		return clamp(-c / a, 0, 1), 0.0
+	
+	b = d0[0]*d1[0] + d0[1]*d1[1] + d0[2]*d1[2]
+	denominator = a*e - b*b
+	
+	if denominator != 0:
+		t0 = clamp((b*f - c*e) / denominator, 0, 1)
+	else:
+		#parallel, pick arbitrary point on l0
+		t0 = 0.0
+	
+	t1 = (b*t0 + f) / e
+	
+	#keep closest point within second segment, and recompute for first
+	if t1 < 0:
+		return clamp(-c / a, 0, 1), 0.0
+	elif t1 > 1:
+		return clamp((b - c) / a, 0, 1), 1.0
+	
+	return t0, t1
+
+def clamp(value, low, high):
+	"""Limit value to the range [low, high]"""
+	
+	return max(low, min(high, value))
+
+def intersectLinesXY(l0, l1):
+	"""Find the intersection of two infinite lines, projected to the XY plane
+	
+	Returns: intersection point on l0, with Z = 0
+	
+	"""
+	
+	x0 = l0.FromX; y0 = l0.FromY
+	dx0 = l0.ToX - x0; dy0 = l0.ToY - y0
+	dx1 = l1.ToX - l1.FromX; dy1 = l1.ToY - l1.FromY
+	
+	denominator = dx0 * dy1 - dy0 * dx1
+	if denominator == 0:
+		raise NameError("Can't intersect parallel lines.")
+	
+	#parameter along l0 where lines cross
+	t = ((l1.FromX - x0) * dy1 - (l1.FromY - y0) * dx1) / denominator
+	
+	return Rhino.Geometry.Point3d(x0 + t * dx0, y0 + t * dy0, 0)
+
+def vectorAngle(vector1, vector2, orientation=None):
 	"""find angle between two vectors, order matters
+		orientation: plane defining direction of positive angles, default world XY
 	
 		Returns: angle in degrees
 	"""
 	
-	angle = rs.VectorAngle(vector1, vector2)
-	if angle is None or abs(angle)<0.001:
+	angle = Rhino.Geometry.Vector3d.VectorAngle(vector1, vector2)
+	if angle == Rhino.RhinoMath.UnsetValue:
+		#zero length vector
+		return None
+	angle = math.degrees(angle)
+	if abs(angle)<0.001:
 		return angle
-	cross = rs.VectorCrossProduct(vector1, vector2)
-	cross = orientation.RemapToPlaneSpace(orientation.Origin + cross)[1]
-	if cross.Z<-0.001:
-		return -1.0*angle
-	elif cross.Z>0.001:
-		return angle
-   
-	#use XZ plane as backup
-	if cross.Y<0:
-		return -1.0*angle
-	return angle
+	cross = Rhino.Geometry.Vector3d.CrossProduct(vector1, vector2)
+	if orientation is not None:
+		cross = orientation.RemapToPlaneSpace(orientation.Origin + cross)[1]
+	
+	#sign from Z, using XZ plane as backup
+	sign = cross.Z if abs(cross.Z)>0.001 else cross.Y
+	#adding 0.0 turns -0.0 into 0.0, so zero counts as positive
+	return math.copysign(angle, sign + 0.0)
 
 # End Functions #
\ No newline at end of file
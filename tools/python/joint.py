@@ -5,13 +5,14 @@ for lap_joint script
 Joint:
 	.id             int             Joint identifier
 	.posts          list            list of 2 posts at joint
-	.pockets        list            list of 2 pockets at joint
+	.pockets        list            list of 2 pockets at joint, empty until built
+	.pocketClass    class           Pocket class used to build pockets
 	.intersection   list            list of closest points on post axes
 	.separation     float           distance between two post axes
 	.axis           Line            unit vector starting at .intersection[0] 
 										pointing towards .intersection[1]
 	.intersecting   Bool            Post axes are actually intersecting
-	.face           PlaneSurface    sheared surface common to both Pockets
+	.face           PlaneSurface    sheared surface common to both Pockets (made by build)
 	.skew           float           angle (radians) of skew between posts (90 = orthogonal)
 	.skewFactor     float           d*skewFactor = distance in skewed UV coordinates
 """
@@ -24,29 +25,40 @@ import common
 from pocket import *
 
 
-class Joint:
+class Joint(object):
 	"""A connection between two Posts."""
 	
-	def __init__(self, p0, p1, id = None, pocketClass=Pocket):
-		"""Initialize a Joint object"""
+	__slots__ = ('posts', 'id', 'intersection', 'intersecting', 'axis', 'separation',
+		'orientation', 'origin', 'selfToGlobal', 'pockets', 'pocketClass', 'face',
+		'skew', 'skewFactor')
+	
+	def __init__(self, p0, p1, id = None, pocketClass=Pocket, intersection=None):
+		"""Initialize a Joint object. Pockets aren't made until build() is called.
+			intersection: closest points on p0 and p1 axes, if already known
+		"""
 		
 		self.posts = [p0, p1]
 		
 		self.id = id
 		
-		self.intersection = common.findClosestPoints(p0.axis, p1.axis)
+		if intersection:
+			self.intersection = intersection
+		else:
+			self.intersection = common.findClosestPoints(p0.axis, p1.axis)
+		
+		#store distance between post axes
+		self.separation = self.intersection[0].DistanceTo(self.intersection[1])
 		
-		if rs.Distance(*self.intersection) <= sc.doc.PageAbsoluteTolerance:
+		if self.separation <= sc.doc.PageAbsoluteTolerance:
 			#lines actually intersect. axis is normal to both input lines
 			self.intersecting = True
-			self.axis = rs.VectorCrossProduct(p0.axis.UnitTangent, p1.axis.UnitTangent)
+			self.axis = Rhino.Geometry.Vector3d.CrossProduct(p0.axis.UnitTangent,
+				p1.axis.UnitTangent)
 		else:
 			self.intersecting = False
-			self.axis = rs.VectorUnitize(Rhino.Geometry.Vector3d(self.intersection[1] 
-				- self.intersection[0]))
-				
-		#store distance between post axes
-		self.separation = rs.Distance(*self.intersection)
+			axis = Rhino.Geometry.Vector3d(self.intersection[1] - self.intersection[0])
+			axis.Unitize()
+			self.axis = axis
 		
 		#orientation is plane at origin, normal along self.axis, x axis along p0
 		#start (arbitrarily) at p0's closest point
@@ -60,27 +72,39 @@ class Joint:
 		self.selfToGlobal = Rhino.Geometry.Transform.ChangeBasis(self.orientation,
 			Rhino.Geometry.Plane.WorldXY)
 		
+		#pockets and face are made by build()
+		self.pocketClass = pocketClass
+		self.pockets = []
+		self.face = None
+		
+	###########
+	#Joint Class Functions
+	
+	def build(self):
+		"""Create pockets on both posts for this joint"""
+		
+		if self.pockets:
+			#already built
+			return
+		
 		#initialize pockets
-		self.pockets = [pocketClass(p0, 0, self), pocketClass(p1, 1, self)]
-		#create sheared surface - starting point for creating pocket toolpaths
+		self.pockets = [self.pocketClass(self.posts[0], 0, self),
+			self.pocketClass(self.posts[1], 1, self)]
+		#create sheared surface - starting point for creating pocket toolpaths. also finds skew
 		self.face = self.commonFace()
-
+		
 		#create pockets
 		for p in self.pockets:
 			p.create()
-		
-	###########
-	#Joint Class Functions
 	
 	def info(self):
 		"""Displays a text summary of this Joint."""
 		
-		print "Joint: " + \
-		','.join([p.printId() for p in self.posts]) + \
-		"\n Axis: [" + printPoint3d(self.intersection[0]) + ', ' + \
-			printPoint3d(self.intersection[1]) + ']' + \
-		"\n Origin: " + printPoint3d(self.origin) + \
-		"\n----"
+		print "Joint: %s\n Axis: [%s, %s]\n Origin: %s\n----" % (
+			','.join([p.printId() for p in self.posts]),
+			common.printPoint3d(self.intersection[0]),
+			common.printPoint3d(self.intersection[1]),
+			common.printPoint3d(self.origin))
 	
 	def display(self, objects=None):
 		"""Create objects in viewport to display information about this Joint
@@ -93,11 +117,15 @@ class Joint:
 		Returns:    list of guids of added objects
 		"""
 		
-		guids = []
-		
 		if objects == None:
 			objects = ['label']
 		
+		if not objects:
+			#nothing to display (e.g. empty joint setting in config)
+			return []
+		
+		guids = []
+		
 		if 'label' in objects:
 			guids.append(rs.AddTextDot(self.printId(), self.origin))
 		if 'axis' in objects:
@@ -105,7 +133,7 @@ class Joint:
 				guids.append(sc.doc.Objects.AddLine(*self.intersection))
 		if 'origin' in objects:
 			guids.append(sc.doc.Objects.AddPoint(self.origin))
-		if 'face' in objects:
+		if 'face' in objects and self.face is not None:
 			guids.append(sc.doc.Objects.AddSurface(self.face))
 		
 		return guids
@@ -153,17 +181,22 @@ class Joint:
 		
 		#build list of corner points
 		pairs = [[0,0],[1,0],[1,1],[0,1]]
-		corners = [grid[0][c[0]].PointAt(Rhino.Geometry.Intersect.Intersection.LineLine(
-			grid[0][c[0]], grid[1][c[1]], 0, False)[1]) for c in pairs]
-		#convert corners to global coordinates
-		corners = [rs.PointTransform(c, self.selfToGlobal) for c in corners]
-		#find angle of skew in pocket
+		corners = [common.intersectLinesXY(grid[0][c[0]], grid[1][c[1]]) for c in pairs]
+		#find angle of skew in pocket (same in joint and global coordinates)
 		self.skew = Rhino.Geometry.Vector3d.VectorAngle(
 			Rhino.Geometry.Vector3d(corners[1] - corners[0]),
 			Rhino.Geometry.Vector3d(corners[3] - corners[0]))
-		self.skewFactor = 1/math.sin(self.skew)
-		
-		#return sheared surface of pocket
-		return Rhino.Geometry.NurbsSurface.CreateFromCorners(*corners)
+		sin = math.sin(self.skew)
+		if sin < 1e-6:
+			raise NameError("Posts are nearly parallel at joint {0}".format(self.printId()))
+		#orthogonal posts are the common case
+		self.skewFactor = 1.0 if abs(sin - 1.0) < 1e-9 else 1.0/sin
+		
+		#sheared surface of pocket, in joint coordinates
+		surface = Rhino.Geometry.NurbsSurface.CreateFromCorners(*corners)
+		#convert to global coordinates
+		surface.Transform(self.selfToGlobal)
+		
+		return surface
 		
 # End Joint Class #
\ No newline at end of file
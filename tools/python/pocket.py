@@ -10,7 +10,7 @@ Pocket:
 	.origin         Point3D         center of pocket face
 	.orientation    Plane           at origin, normal pointing towards other post, 
 										x axis aligned to Post's axis
-	.profilePlane   Plane           orientation rotated parallel to Post's profile
+	.profilePlane   Plane           orientation rotated parallel to Post's profile (made on first use)
 	.normal         Vector3D        normal of orientation plane
 	.rotation       float           rotation of joint off of vertical on oriented post in degrees
 	.profileBounds  BoundingBox     Post's end face in pocket's orientation
@@ -23,7 +23,6 @@ import Rhino
 import scriptcontext as sc
 import rhinoscriptsyntax as rs
 
-from copy import copy
 import math
 
 import common
@@ -32,6 +31,12 @@ from toolpath import *
 class Pocket(object):
 	"""One half of a joint, cut into a post."""
 	
+	__slots__ = ('joint', 'post', 'type', 'index', 'normal', 'origin', 'orientation',
+		'_profilePlane', 'profileBounds', 'rotation', 'globalToMill', '_millToGlobal', 'face',
+		'holes', 'toolpath', '_orientationToGlobal', '_profileLocal', '_sections', '_faceBounds',
+		'_millTransforms', '_faceDomainV', '_faceAffine', '_postMargin', '_UVmillD', '_UVmillR',
+		'_UVstepOver', '_stepDown')
+	
 	def __init__(self, post, index, joint):
 		"""Gather information about this Pocket."""
 		
@@ -42,6 +47,12 @@ class Pocket(object):
 		
 		self.type = 'default'
 		
+		#results of getSection and getFaceBounds, by distance from pocket face
+		self._sections = {}
+		self._faceBounds = {}
+		#global to mill transforms with additional rotation, by angle
+		self._millTransforms = {}
+		
 		post.pockets.append(self)
 		#set pocket index so we can find other pockets in this joint
 		self.index = index
@@ -57,27 +68,54 @@ class Pocket(object):
 		self.origin = self.joint.origin
 		
 		self.orientation = rs.PlaneFromNormal(self.origin, self.normal, post.axis.Direction)
-		
-		self.profilePlane = rs.RotatePlane(self.orientation, 90, self.orientation.YAxis)
-		self.profilePlane.Origin = self.post.origin
+		#convert from pocket's coordinates to global
+		self._orientationToGlobal = Rhino.Geometry.Transform.ChangeBasis(self.orientation,
+			Rhino.Geometry.Plane.WorldXY)
 		
 		#find extents of this post at joint
 		self.profileBounds = self.post.profile.GetBoundingBox(self.orientation)
-		
-		#find rotation of pocket on post in degrees
-		self.rotation = common.vectorAngle(self.post.orientation.XAxis, 
-			self.normal, self.post.orientation) + 180
+		#profile vertices in pocket coordinates, for slicing in getSection
+		self._profileLocal = self.getProfileLocal()
+		
+		#find rotation of pocket on post in degrees. normal is perpendicular to post axis,
+		#so its angle from post's x axis comes straight from its components in post's plane
+		rotation = math.degrees(math.atan2(self.normal * self.post.orientation.YAxis,
+			self.normal * self.post.orientation.XAxis)) + 180
+		#anti-parallel normal gives +-180 from atan2 depending on sign of zero. keep to [0, 360)
+		self.rotation = round(rotation, 6) % 360
 			
+		#rotation of post to bring pocket to mill's orientation
+		angle = -self.rotation * math.pi/180
+		
 		#transform from global to rotated post local
-		self.globalToMill = self.post.globalToSelf * Rhino.Geometry.Transform.Rotation(-self.rotation * math.pi/180,
+		self.globalToMill = self.post.globalToSelf * Rhino.Geometry.Transform.Rotation(angle,
 			self.post.axis.UnitTangent, self.post.origin)
-			
-		#transform from rotated post local to global
-		t = self.globalToMill.TryGetInverse()
-		if t[0]:
-			self.millToGlobal = t[1]
-		else:
-			raise NameError("Couldn't find inverse of rotated post -> global transform")
+		
+		#profilePlane and millToGlobal are made on demand
+		self._profilePlane = None
+		self._millToGlobal = None
+	
+	@property
+	def profilePlane(self):
+		"""orientation rotated parallel to Post's profile, at Post's origin"""
+		
+		if self._profilePlane is None:
+			plane = rs.RotatePlane(self.orientation, 90, self.orientation.YAxis)
+			plane.Origin = self.post.origin
+			self._profilePlane = plane
+		
+		return self._profilePlane
+	
+	@property
+	def millToGlobal(self):
+		"""transform from rotated post local to global"""
+		
+		if self._millToGlobal is None:
+			#undo each step in reverse, rather than inverting the combined matrix
+			self._millToGlobal = Rhino.Geometry.Transform.Rotation(self.rotation * math.pi/180,
+				self.post.axis.UnitTangent, self.post.origin) * self.post.selfToGlobal
+		
+		return self._millToGlobal
 
 
 	###########
@@ -89,8 +127,9 @@ class Pocket(object):
 		print "Pocket: <{0}> on {1}\nOrigin: {2}\n----".format(
 			self.type, self.post.printId(), common.printPoint3d(self.origin))
 	
-	def display(self, objects=None):
+	def display(self, objects=None, transform=Rhino.Geometry.Transform.Identity):
 		"""Create objects in viewport to display information about this Joint
+			transform: applied to geometry before it is added
 		
 		Creates:    postLabel   id of other post
 					jointLabel  id of joint
@@ -113,32 +152,37 @@ class Pocket(object):
 		
 		
 		if 'postLabel' in objects:
-			guids.append(rs.AddTextDot(self.joint.posts[not self.index].printId(), self.origin))
+			guids.append(rs.AddTextDot(self.joint.posts[not self.index].printId(),
+				transform * self.origin))
 		if 'jointLabel' in objects:
-			guids.append(rs.AddTextDot(self.joint.printId(), self.origin))
+			guids.append(rs.AddTextDot(self.joint.printId(), transform * self.origin))
 		if 'orientation' in objects:
 			#display orientation plane
-			guids.append(common.displayPlane(self.orientation))
+			guids.append(common.displayPlane(self.orientation, transform))
 		if 'bounds' in objects:
-			#display post profile bounding box
-			guids.append(common.displayBoundingBox(self.profileBounds, self.orientation, self.profilePlane))
+			#display post profile bounding box (flat, since profile is normal to post axis)
+			guids.append(common.displayBoundingBox(self.profileBounds, self.orientation,
+				self.profilePlane, is2D=True, transform=transform))
 		if 'center' in objects:
-			guids.append(sc.doc.Objects.AddPoint(self.orientation.Origin))
+			guids.append(sc.doc.Objects.AddPoint(transform * self.orientation.Origin))
 		if 'face' in objects:
 			#display pocket face
-			guids.append(sc.doc.Objects.AddSurface(self.face))
+			face = self.face.Duplicate()
+			face.Transform(transform)
+			guids.append(sc.doc.Objects.AddSurface(face))
 		if 'holes' in objects:
 			#display any drill holes
 			for h in self.holes:
-				guids.append(sc.doc.Objects.AddLine(h))
+				guids.append(sc.doc.Objects.AddLine(transform * h.From, transform * h.To))
 		if 'toolpath' in objects:
 			#display milling paths
-			newguids = self.toolpath.display(transform=self.post.selfToGlobal)
+			newguids = self.toolpath.display(transform=transform * self.post.selfToGlobal)
 			#print newguids
 			guids.extend(newguids)
 		if 'axis' in objects:
 			#display pocket face normal
-			g = sc.doc.Objects.AddLine(self.origin, self.origin + self.normal)
+			g = sc.doc.Objects.AddLine(transform * self.origin,
+				transform * (self.origin + self.normal))
 			guids.append(g)
 		
 		return guids
@@ -148,17 +192,75 @@ class Pocket(object):
 			A: additional rotation relative to pocket's rotation
 		"""
 		
-		if A:
-			globalToMill = self.post.globalToSelf * \
-				Rhino.Geometry.Transform.Rotation(-(self.rotation + A) * math.pi/180,
-				self.post.axis.UnitTangent, self.post.origin)
+		return self.UVToPostList([(p.X, p.Y, p.Z)], A)[0]
+	
+	def UVToPostList(self, points, A=0):
+		"""change a list of points from UV coordinates on skewed pocket face to 
+			post's coordinates, with a single transformation call
+			points: list of (u, v, distance from face) tuples
+			A: additional rotation relative to pocket's rotation
+			
+			Returns: list of points
+		"""
+		
+		globalToMill = self.getGlobalToMill(A)
+		
+		#global points
+		if self._faceAffine:
+			#no need to evaluate surface
+			o, uVector, vVector = self._faceAffine
+			n = self.normal
+			points = [Rhino.Geometry.Point3d(
+				o.X + u * uVector.X + v * vVector.X + z * n.X,
+				o.Y + u * uVector.Y + v * vVector.Y + z * n.Y,
+				o.Z + u * uVector.Z + v * vVector.Z + z * n.Z) for u, v, z in points]
 		else:
-			globalToMill = self.globalToMill
+			points = [self.face.PointAt(u, v) + self.normal * z for u, v, z in points]
+		
+		return list(globalToMill.TransformList(points))
+	
+	def getFaceAffine(self):
+		"""Check whether pocket face is a parallelogram with linear parameterization, 
+			so that PointAt(u, v) = o + u * uVector + v * vVector
+		
+		Returns: [o, uVector, vVector], or None if face needs full evaluation
+		"""
 		
-		point = (self.face.PointAt(p.X, p.Y) + self.normal * p.Z)
-		point.Transform(globalToMill)
+		face = self.face
+		if face.Degree(0) != 1 or face.Degree(1) != 1 or \
+			face.SpanCount(0) != 1 or face.SpanCount(1) != 1:
+			return None
 		
-		return point
+		uDomain = face.Domain(0)
+		vDomain = face.Domain(1)
+		p00 = face.PointAt(uDomain.Min, vDomain.Min)
+		uVector = (face.PointAt(uDomain.Max, vDomain.Min) - p00) / uDomain.Length
+		vVector = (face.PointAt(uDomain.Min, vDomain.Max) - p00) / vDomain.Length
+		o = p00 - uVector * uDomain.Min - vVector * vDomain.Min
+		
+		#opposite corner and center must also fit, or face is twisted or rational
+		for u, v in [[uDomain.Max, vDomain.Max], [uDomain.Mid, vDomain.Mid]]:
+			if face.PointAt(u, v).DistanceTo(o + uVector * u + vVector * v) > 1e-8:
+				return None
+		
+		return [o, uVector, vVector]
+	
+	def getGlobalToMill(self, A=0):
+		"""Find transform from global to rotated post local coordinates
+			A: additional rotation relative to pocket's rotation
+		
+		Returns: Transform
+		"""
+		
+		if not A:
+			return self.globalToMill
+		
+		if A not in self._millTransforms:
+			self._millTransforms[A] = self.post.globalToSelf * \
+				Rhino.Geometry.Transform.Rotation(-(self.rotation + A) * math.pi/180,
+				self.post.axis.UnitTangent, self.post.origin)
+		
+		return self._millTransforms[A]
 	
 	def getBounds(self):
 		"""Find the extents of this post at pocket
@@ -166,13 +268,30 @@ class Pocket(object):
 		Returns: bounding box of post profile oriented to pocket orientation
 		"""
 		
-		return self.post.profile.GetBoundingBox(self.orientation)
+		#profile and orientation don't change after __init__
+		return self.profileBounds
 		
 	def create(self):
 		"""Finish creating this pocket, once common joint info has been determined"""
 		
 		#find pocket face boundary
 		self.face = self.createPocketFace()
+		#default V range of pocket, reused for every level of toolpath
+		self._faceDomainV = self.face.Domain(1)
+		#linear map from UV to global, if face is flat and evenly parameterized
+		self._faceAffine = self.getFaceAffine()
+		
+		#milling dimensions used at every level of toolpath
+		millDiameter = common.settings.gcode['millDiameter']
+		#room around post profile at each level
+		self._postMargin = 1.5 * millDiameter
+		#mill diameter and radius in skewed UV coordinates
+		self._UVmillD = millDiameter * self.joint.skewFactor
+		self._UVmillR = self._UVmillD / 2
+		#distance between zigs in UV coordinates
+		self._UVstepOver = common.settings.gcode['stepOver'] * self._UVmillD
+		#depth of each level
+		self._stepDown = common.settings.gcode['stepDown'] * millDiameter
 		
 		#find bolt hole
 		self.holes = self.createHoles()
@@ -186,7 +305,8 @@ class Pocket(object):
 		Returns: millable pocket face
 		"""
 		
-		surface = copy(self.joint.face)
+		#shared with other pocket - not modified, Transpose and Extend return new surfaces
+		surface = self.joint.face
 		
 		#swap U and V for second Post
 		if self.index == 1:
@@ -217,16 +337,67 @@ class Pocket(object):
 		#return center line
 		return [Rhino.Geometry.Line(cPoint, -self.orientation.Normal, 2)]
 		
+	def getProfileLocal(self):
+		"""Find vertices of post profile in pocket's coordinates
+		
+		Returns: list of (x, y, z) tuples, closed (last equals first), or None if 
+			profile isn't a polyline
+		"""
+		
+		success, polyline = self.post.profile.TryGetPolyline()
+		if not success or not polyline.IsClosed:
+			return None
+		
+		toLocal = Rhino.Geometry.Transform.ChangeBasis(Rhino.Geometry.Plane.WorldXY,
+			self.orientation)
+		
+		return [(p.X, p.Y, p.Z) for p in toLocal.TransformList(polyline)]
+	
 	def getSection(self, d):
 		"""Find bounding box of post geometry above given distance from pocket face
 		
 		Returns: bounding box containing relevant section of profile
 		"""
 		
-		#construct plane with which to slice profile
-		plane = copy(self.orientation)
-		#move joint plane 
-		plane.Translate(plane.ZAxis * d)
+		#profile doesn't change, so reuse sections at same distance
+		key = round(d, 6)
+		if key in self._sections:
+			return self._sections[key]
+		
+		#quick check for levels outside of profile
+		if d <= self.profileBounds.Min.Z:
+			#whole profile is above this level
+			return self.profileBounds
+		if d >= self.profileBounds.Max.Z:
+			#nothing above this level
+			return Rhino.Geometry.BoundingBox.Empty
+		
+		if self._profileLocal:
+			#slice straight edged profile directly, with no curve intersections
+			points = []
+			vertices = self._profileLocal
+			for i in range(len(vertices) - 1):
+				a = vertices[i]
+				b = vertices[i + 1]
+				if a[2] > d:
+					points.append(Rhino.Geometry.Point3d(*a))
+				if (a[2] > d) != (b[2] > d):
+					#edge crosses plane - add crossing point
+					t = (d - a[2]) / (b[2] - a[2])
+					points.append(Rhino.Geometry.Point3d(a[0] + t * (b[0] - a[0]),
+						a[1] + t * (b[1] - a[1]), d))
+			
+			if points:
+				bounds = Rhino.Geometry.BoundingBox(points)
+			else:
+				bounds = Rhino.Geometry.BoundingBox.Empty
+			
+			self._sections[key] = bounds
+			return bounds
+		
+		#plane with which to slice profile: joint plane moved along its normal
+		plane = Rhino.Geometry.Plane(self.orientation.PointAt(0, 0, d), self.orientation.XAxis,
+			self.orientation.YAxis)
 		#intersect with Post profile
 		intersections = Rhino.Geometry.Intersect.Intersection.CurvePlane(self.post.profile, plane, 0)
 		if intersections:
@@ -240,15 +411,14 @@ class Pocket(object):
 			#get bounding box for each piece of profile curve
 			box = p.GetBoundingBox(self.orientation)
 			#keep this bounding box if its center is above the plane
-			center = box.Center
 			#bounding box coordinates are local to the plane where the box was created - convert to global
-			center.Transform(Rhino.Geometry.Transform.ChangeBasis(self.orientation, 
-				Rhino.Geometry.Plane.WorldXY))
-			if plane.DistanceTo(center) > 0:
+			center = self._orientationToGlobal * box.Center
+			if (center - self.orientation.Origin) * self.orientation.ZAxis > d:
 				#add this bounding box to running total
 				bounds.Union(box)
 			
 		#common.displayBoundingBox(bounds, self.orientation, self.profilePlane)
+		self._sections[key] = bounds
 		return bounds
 	
 	def getFaceBounds(self, d, uEnds=False, vEnds=False):
@@ -257,14 +427,19 @@ class Pocket(object):
 			Returns: (uRange, vRange)
 		"""
 		
+		#ends may be lists - make hashable. False compares equal to 0.0, so use None for defaults
+		key = (round(d, 6),) + tuple(tuple(None if x is False else x for x in ends) if ends
+			else None for ends in [uEnds, vEnds])
+		if key in self._faceBounds:
+			return self._faceBounds[key]
+		
 		#zigs
 		#find post width at this height, adding room for endmill diameter
 		bounds = self.getSection(d)
 		
 		uPost = Rhino.Geometry.Interval(
 			*[self.face.ClosestPoint(self.orientation.PointAt(0,y,0))[1] for y in
-			[bounds.Min.Y - 1.5*common.settings.gcode['millDiameter'], 
-			bounds.Max.Y + 1.5*common.settings.gcode['millDiameter']]])
+			[bounds.Min.Y - self._postMargin, bounds.Max.Y + self._postMargin]])
 		
 		if uEnds:
 			uRange = list(uEnds)
@@ -281,92 +456,94 @@ class Pocket(object):
 		if vEnds:
 			vRange = Rhino.Geometry.Interval(*vEnds)
 		else:
-			vRange = self.face.Domain(1)
+			vRange = self._faceDomainV
 		
 		#shrink ranges to account for endmill radius
-		UVmillR = common.settings.gcode['millDiameter'] * self.joint.skewFactor / 2
-		uRange = Rhino.Geometry.Interval(uRange.Min + UVmillR, uRange.Max - UVmillR)
-		vRange = Rhino.Geometry.Interval(vRange.Min + UVmillR, vRange.Max - UVmillR)
+		uRange = Rhino.Geometry.Interval(uRange.Min + self._UVmillR, uRange.Max - self._UVmillR)
+		vRange = Rhino.Geometry.Interval(vRange.Min + self._UVmillR, vRange.Max - self._UVmillR)
 		
+		self._faceBounds[key] = [uRange, vRange]
 		return [uRange, vRange]
 		
-	def facePath(self, d, start=[False, False], uEnds=False, vEnds=False, dir=1):
+	def facePath(self, d, start=[False, False], uEnds=False, vEnds=False, dir=1, UV=False):
 		"""create minimal zig-zag facing path given distance from pocket face
 			start in corner specified by `start`: 
 				[0,0] - min U, minV
 				[1,1] - max U, max V
 			dir: 0 = long moves along same V, 1 = long moves along same U
+			UV: leave path as (u, v, d) tuples, for changing coordinates later
 			Returns: [end corner, list of global points]
 		"""
 		
-		UVmillD = common.settings.gcode['millDiameter'] * self.joint.skewFactor
-		
 		#get bounds on pocket face for this level
 		bounds = self.getFaceBounds(d, uEnds, vEnds)
 		uRange = bounds[0]
 		vRange = bounds[1]
 		
-		#start in correct corner
-		path = [Rhino.Geometry.Point3d(uRange.Max if start[0] else uRange.Min, 
-			vRange.Max if start[1] else vRange.Min, d)]
-		
-		#switchback in U or V. more concise way to do this?
 		if dir:
 			#long moves along same U
-			
-			#direction keeps track of alternating switchback directions (U)
-			uDirection = not start[0]
-			vDirection = -1 if start[1] else 1
-		
-			#switchback until we've gone just over the edge in either direction
-			while vRange.Min <= path[-1].Y <= vRange.Max:
-				path.append(copy(path[-1]))
-				#move to other side of pocket
-				path[-1].X = uRange.Max if uDirection else uRange.Min
-				path.append(copy(path[-1]))
-				#step over to next zig
-				path[-1].Y += vDirection * common.settings.gcode['stepOver'] * UVmillD
-				#reverse direction
-				uDirection = not uDirection
-			
-			#shorten the final zag to be at the edge of the pocket
-			path[-1].Y = vRange.Min if start[1] else vRange.Max
-			#add a final zig to get the exact pocket width
-			path.append(copy(path[-1]))
-			path[-1].X = uRange.Max if uDirection else uRange.Min
-			
-			#change to rotated post's coordinates
-			path = [self.UVToPost(p) for p in path]
-			
-			return [[uDirection, vDirection > 0], path]
+			uDirection, vDirection, path = self.zigZag(uRange, vRange, start[0], start[1],
+				self._UVstepOver)
+			path = [(u, v, d) for u, v in path]
 		else:
 			#long moves along same V
-			
-			#direction keeps track of alternating switchback directions (U)
-			uDirection = -1 if start[0] else 1
-			vDirection = not start[1]
-			
-			#switchback until we've gone just over the edge in either direction
-			while uRange.Min <= path[-1].X <= uRange.Max:
-				path.append(copy(path[-1]))
-				#move to other side of pocket
-				path[-1].Y = vRange.Max if vDirection else vRange.Min
-				path.append(copy(path[-1]))
-				#step over to next zig
-				path[-1].X += uDirection * common.settings.gcode['stepOver'] * UVmillD
-				#reverse direction
-				vDirection = not vDirection
-			
-			#shorten the final zag to be at the edge of the pocket
-			path[-1].X = uRange.Min if start[0] else uRange.Max
-			#add a final zig to get the exact pocket width
-			path.append(copy(path[-1]))
-			path[-1].Y = vRange.Max if vDirection else vRange.Min
-			
+			vDirection, uDirection, path = self.zigZag(vRange, uRange, start[1], start[0],
+				self._UVstepOver)
+			path = [(u, v, d) for v, u in path]
+		
+		if not UV:
 			#change to rotated post's coordinates
-			path = [self.UVToPost(p) for p in path]
+			path = self.UVToPostList(path)
+		
+		return [[uDirection, vDirection], path]
+	
+	def zigZag(self, aRange, bRange, aStart, bStart, step):
+		"""create zig-zag path with long moves along a, stepping over along b
+			aStart, bStart: start at max (True) or min (False) of each range
 			
-			return [[uDirection > 0, vDirection], path]
+			Returns: [direction of final long move, direction of step overs, 
+				list of (a, b) points]. directions are True towards max
+		"""
+		
+		#ends of each range, indexed by start/direction flags
+		aEnds = (aRange.Min, aRange.Max)
+		bEnds = (bRange.Min, bRange.Max)
+		
+		#direction keeps track of alternating switchback directions (a)
+		aDirection = not aStart
+		bDirection = 1 - 2 * bStart
+		
+		#start in correct corner
+		a0 = aEnds[aStart]
+		b0 = bEnds[bStart]
+		
+		#number of zigs to go just over the edge in either direction
+		zigs = int(math.floor((bRange.Max - bRange.Min) / step)) + 1
+		
+		#side of pocket for even and odd zigs, starting with aDirection
+		aSides = (aEnds[aDirection], aEnds[aStart])
+		bStep = bDirection * step
+		
+		path = [(a0, b0)]
+		b = b0
+		for i in range(zigs):
+			a = aSides[i % 2]
+			#move to other side of pocket
+			path.append((a, b))
+			#step over to next zig
+			b = b0 + (i + 1) * bStep
+			path.append((a, b))
+		
+		#direction of final zig
+		aDirection = aDirection != (zigs % 2 == 1)
+		
+		#shorten the final zag to be at the edge of the pocket
+		bEnd = bEnds[not bStart]
+		path[-1] = (path[-1][0], bEnd)
+		#add a final zig to get the exact pocket width
+		path.append((aEnds[aDirection], bEnd))
+		
+		return [aDirection, bDirection > 0, path]
 	
 	def blockPath(self, startZ, endZ, uEnds=False, vEnds=False, finish=False, dir=1):
 		"""Create path to mill a face from startZ to endZ
@@ -377,33 +554,26 @@ class Pocket(object):
 		"""
 		
 		#start at first cut layer for block, or bottom of pocket if closer
-		currentZ = max([startZ - \
-			(common.settings.gcode['stepDown'] * common.settings.gcode['millDiameter']),
-			endZ])
-		
-		#create toolpath object
-		toolpath = Toolpath()
-		
+		currentZ = max([startZ - self._stepDown, endZ])
+		
+		#find all levels first, so operations list can be made at full size
+		levels = [currentZ]
+		while currentZ > endZ:
+			#at least one more pass - move to next level
+			currentZ -= self._stepDown
+			if currentZ < endZ:
+				#within one layer of pocket face - finish at pocket face
+				currentZ = endZ
+			levels.append(currentZ)
+		
+		#UV paths for all levels, each starting where the last one ended
 		result = [[False, False], False]
-		while True:
-			#mill pocket face
-			result = self.facePath(currentZ, result[0], uEnds, vEnds, dir=dir)
-			toolpath.operations.append(Mill(result[1]))
-			#insert rapid move before this mill
-			rapid = copy(toolpath.operations[-1].path[0])
-			
-			toolpath.operations[-1].path.pop(0)
-			toolpath.operations.insert(-1, Rapid(rapid, A=None, clear=False))
-			
-			if currentZ > endZ:
-				#at least one more pass - move to next level
-				currentZ -= (common.settings.gcode['stepDown'] * common.settings.gcode['millDiameter'])
-				if currentZ < endZ:
-					#within one layer of pocket face - finish at pocket face
-					currentZ = endZ
-			else:
-				#done!
-				break
+		UVPath = []
+		ends = []
+		for z in levels:
+			result = self.facePath(z, result[0], uEnds, vEnds, dir=dir, UV=True)
+			UVPath.extend(result[1])
+			ends.append(len(UVPath))
 		
 		#clean up pocket edge if needed
 		if finish:
@@ -413,20 +583,36 @@ class Pocket(object):
 			vRange = bounds[1]
 			
 			#corner vertices around edge of pocket
-			edge = [Rhino.Geometry.Point3d(p[0],p[1],currentZ) for p in [[uRange.Min,
+			edge = [(p[0], p[1], currentZ) for p in [[uRange.Min,
 			vRange.Min],[uRange.Max,vRange.Min],[uRange.Max,vRange.Max],[uRange.Min,vRange.Max]]]
 			
-			#sorry. incomprehensible. This finds the index of the starting vertex in edge
-			start = int((1 if result[0][1] else -1) * (result[0][0] + .5) + 1.5)
+			#index of the starting vertex in edge, by final [U, V] directions of facing
+			start = [[1, 2], [0, 3]][result[0][0]][result[0][1]]
 			
 			#rotate edge so that start is at the front
 			rotated = edge[start:] + edge[:start]
 			#cut along the two sides with ridges from the zigzags
-			path = rotated[0:3]
-			#change to post's coordinates
-			path = [self.UVToPost(p) for p in path]
-			
-			toolpath.operations.append(Mill(path))
+			UVPath.extend(rotated[0:3])
+		
+		#change all levels (and edge) to rotated post's coordinates at once
+		path = self.UVToPostList(UVPath)
+		
+		#create toolpath object
+		toolpath = Toolpath()
+		#rapid and mill for each level, and one more mill around edge if finishing
+		operations = [None] * (2 * len(levels) + (1 if finish else 0))
+		
+		start = 0
+		for i, end in enumerate(ends):
+			#rapid move to start of level, then mill the rest
+			operations[2 * i] = Rapid(path[start], A=None, clear=False)
+			operations[2 * i + 1] = Mill(path[start + 1:end])
+			start = end
+		
+		if finish:
+			operations[-1] = Mill(path[start:])
+		
+		toolpath.operations = operations
 		
 		return toolpath
 	
@@ -455,7 +641,7 @@ class Pocket(object):
 			Returns: gcode string
 		"""
 		
-		gcode.text += "\n(Starting Pocket {0})\n".format(self.joint.printId())
+		gcode.append("\n(Starting Pocket {0})\n".format(self.joint.printId()))
 		
 		#generate gcode from toolpath
 		self.toolpath.makeGcode(gcode=gcode)
@@ -476,6 +662,8 @@ class Pocket_mfBar(Pocket):
 		index 1: male - bar parallel to post axis
 	"""
 	
+	__slots__ = ()
+	
 	def __init__(self, post, index, joint):
 		"""Gather information about this Pocket."""
 		
@@ -487,25 +675,13 @@ class Pocket_mfBar(Pocket):
 	###########
 	#Pocket_mfBar Class Functions
 	
-	def display(self, objects=None):
+	def display(self, objects=None, transform=Rhino.Geometry.Transform.Identity):
 		"""Change defaults from base Pocket class"""
 		
 		if objects == None:
 			objects = ['toolpath']
 		
-		return super(Pocket_mfBar, self).display(objects)
-	
-	def create(self):
-		"""Finish creating this pocket, once common joint info has been determined"""
-		
-		#find pocket face boundary
-		self.face = self.createPocketFace()
-		
-		#find pocket holes
-		self.holes = self.createHoles()
-		
-		#create milling path
-		self.toolpath = self.makeToolpath()
+		return super(Pocket_mfBar, self).display(objects, transform)
 	
 	def makeToolpath(self):
 		"""Create path to mill this pocket
@@ -603,26 +779,19 @@ class Pocket_mfBar(Pocket):
 		"""
 		
 		toLocal = Rhino.Geometry.Transform.ChangeBasis(Rhino.Geometry.Plane.WorldXY, self.profilePlane)
-		toGlobal = toLocal.TryGetInverse()
-		if toGlobal[0]:
-			toGlobal = toGlobal[1]
-		else:
-			raise NameError("Can't invert toLocal transform!")
-			return False
 		
 		#axis line, from post axis, directed away from other post (local)
 		#axis = Rhino.Geometry.Line(0,0,0, 0,-12,0)
 		
 		#axis line, from pocket face center, directed away from other post (local)
-		originLocal = copy(self.origin)
-		originLocal.Transform(toLocal)
+		originLocal = toLocal * self.origin
 		
 		start = Rhino.Geometry.Point3d(originLocal.X, 0, 0)
 		
 		axis = Rhino.Geometry.Line(start, Rhino.Geometry.Vector3d.XAxis, 12)
 		
 		#post profile rectangle in profilePlane coordinates
-		rectangle = copy(self.post.profile)
+		rectangle = self.post.profile.DuplicateCurve()
 		rectangle.Transform(toLocal)
 		
 		#print axis, rectangle.TryGetPolyline()[1].ToArray()
@@ -637,8 +806,8 @@ class Pocket_mfBar(Pocket):
 		
 		#return center line
 		#return [Rhino.Geometry.Line(self.joint.intersection[self.index], -self.orientation.Normal, end)]
-		startGlobal = copy(start)
-		startGlobal.Transform(toGlobal)
+		#back to global directly from profilePlane, no need to invert toLocal
+		startGlobal = self.profilePlane.PointAt(start.X, start.Y, start.Z)
 		return [Rhino.Geometry.Line(startGlobal, -self.orientation.Normal, length)]
 		
 	def makeHoleToolpathV(self):
@@ -653,14 +822,14 @@ class Pocket_mfBar(Pocket):
 		toolpath = Toolpath()
 		
 		localOrigin = self.post.globalToSelf * self.origin
-		path = [Rhino.Geometry.Point3d(localOrigin.X, 
-			common.settings.gcode['clearance'] - mark, 
-			common.settings.gcode['clearance']) for x in range(3)]
-		
-		#move to center, bottom of mark
-		path[1].Y = 0; path[1].Z = mark
-		#back up to other side
-		path[2].Y = -path[2].Y
+		clearance = common.settings.gcode['clearance']
+		path = [
+			#start above one side
+			Rhino.Geometry.Point3d(localOrigin.X, clearance - mark, clearance),
+			#move to center, bottom of mark
+			Rhino.Geometry.Point3d(localOrigin.X, 0, mark),
+			#back up to other side
+			Rhino.Geometry.Point3d(localOrigin.X, mark - clearance, clearance)]
 		
 		#rapid to start
 		toolpath.operations.append(Rapid(path[0], A=self.rotation - 180, clear=True))
@@ -718,17 +887,16 @@ class Pocket_mfBar(Pocket):
 		toolpath = Toolpath()
 		
 		#start of screw axis in skewed pocket face coordinates
-		localOrigin = self.face.ClosestPoint(self.origin)
-		localOrigin = Rhino.Geometry.Point3d(localOrigin[1],localOrigin[2],0)
+		success, u, v = self.face.ClosestPoint(self.origin)
 		
 		if self.index == 0:
 			#female - negative offset along male's axis
-			localOrigin.X -= common.settings.pocket['holeOffset']
+			u -= common.settings.pocket['holeOffset']
 		else:
 			#male - offset screw along post's axis
-			localOrigin.Y += common.settings.pocket['holeOffset']
+			v += common.settings.pocket['holeOffset']
 			
-		localCenter = self.UVToPost(localOrigin, A=180)
+		localCenter = self.UVToPostList([(u, v, 0)], A=180)[0]
 		top = Rhino.Geometry.Point3d(localCenter.X, localCenter.Y, 
 			common.settings.gcode['clearance'])
 		bottom = Rhino.Geometry.Point3d(localCenter.X, localCenter.Y, localCenter.Z + mark)
@@ -21,6 +21,7 @@ import Rhino
 import scriptcontext as sc
 import rhinoscriptsyntax as rs
 
+import heapq
 import math
 
 import common
@@ -101,6 +102,11 @@ class Post:
 			#construct rectangular profile curve
 			self.profile = self.makeRectProfile(width, height)
 			
+			#final orientation, matching findOrientation: x axis points from the middle of
+			#the first profile edge (at +width/2 along x) towards the origin, so flip x and y
+			self.orientation = rs.PlaneFromNormal(self.axis.From, self.axis.UnitTangent,
+				-self.orientation.XAxis)
+			
 		elif obRef: #no axis, need obRef
 			object = obRef.Object()
 			if object is None:
@@ -109,13 +115,15 @@ class Post:
 			#actual object geometry
 			self.brep = common.getBrep(object)
 			
+			#area and centroid of each face, computed once
+			faces = [(face, Rhino.Geometry.AreaMassProperties.Compute(face))
+				for face in self.brep.Faces]
 			#assume smallest faces are the ends of the Post
-			endFaces = sorted(self.brep.Faces, key=rs.SurfaceArea)[0:2]
+			endFaces = heapq.nsmallest(2, faces, key=lambda f: f[1].Area)
 			#get curve defining post profile
-			self.profile = Rhino.Geometry.Curve.JoinCurves(endFaces[0].DuplicateFace(False).DuplicateEdgeCurves())
+			self.profile = Rhino.Geometry.Curve.JoinCurves(endFaces[0][0].DuplicateFace(False).DuplicateEdgeCurves())
 			#axis is a Line between centers of smallest faces.
-			self.axis = Rhino.Geometry.Line(
-				*[rs.SurfaceAreaCentroid(face)[0] for face in endFaces])
+			self.axis = Rhino.Geometry.Line(*[f[1].Centroid for f in endFaces])
 		
 		else : #no axis and no obRef
 			raise NameError('No valid axis or obRef given.')
@@ -123,8 +131,9 @@ class Post:
 		#just for convenience and simplicity
 		self.origin = self.axis.From
 		
-		#get orientation of Post
-		self.orientation = self.findOrientation()
+		if not axis:
+			#get orientation of Post from its profile
+			self.orientation = self.findOrientation()
 		
 		#store conversions to and from Post's orientation
 		
@@ -155,9 +164,10 @@ class Post:
 		"\n Origin: " + common.printPoint3d(self.origin) + \
 		"\n----"
 		
-	def display(self, objects=None):
+	def display(self, objects=None, transform=Rhino.Geometry.Transform.Identity):
 		"""Create objects in viewport to display information about this post. 
 			'objects' determines which objects to display
+			'transform' is applied to geometry before it is added
 		
 		Creates:
 			label       text dot with post id
@@ -175,21 +185,26 @@ class Post:
 			objects = ['label', 'orientation']
 		
 		if 'label' in objects:
-			guids.append(rs.AddTextDot(self.printId(), self.origin))
+			guids.append(rs.AddTextDot(self.printId(), transform * self.origin))
 		if 'orientation' in objects:
-			guids.append(common.displayPlane(self.orientation))
+			guids.append(common.displayPlane(self.orientation, transform))
 		if 'profile' in objects:
-			guids.append(sc.doc.Objects.AddCurve(self.profile))
+			profile = self.profile.DuplicateCurve()
+			profile.Transform(transform)
+			guids.append(sc.doc.Objects.AddCurve(profile))
 		if 'object' in objects:
 			if not self.brep:
 				vector = Rhino.Geometry.Vector3d(self.axis.To - self.axis.From)
-				guids.append(sc.doc.Objects.AddBrep(
-					Rhino.Geometry.Surface.CreateExtrusion(self.profile, vector).ToBrep()))
+				brep = Rhino.Geometry.Surface.CreateExtrusion(self.profile, vector).ToBrep()
+				brep.Transform(transform)
+				guids.append(sc.doc.Objects.AddBrep(brep))
 				rs.CapPlanarHoles(guids[-1])
 		if 'axis' in objects:
-			guids.append(sc.doc.Objects.AddLine(self.axis))
+			guids.append(sc.doc.Objects.AddLine(transform * self.axis.From,
+				transform * self.axis.To))
 		if 'xAxis' in objects:
-			guids.append(sc.doc.Objects.AddLine(self.origin, self.origin + self.orientation.XAxis))
+			guids.append(sc.doc.Objects.AddLine(transform * self.origin,
+				transform * (self.origin + self.orientation.XAxis)))
 		
 		return guids
 	
@@ -207,7 +222,7 @@ class Post:
 		
 		#grab one edge of profile arbitrarily
 		if type(self.profile) is Rhino.Geometry.PolyCurve:
-			one_edge = self.profile.Explode()[0]
+			one_edge = self.profile.SegmentCurve(0)
 		else:
 			raise NameError("Profile is wrong type of curve: " + str(type(self.profile)))
 			
@@ -240,14 +255,14 @@ class Post:
 		#get corner uv coordinates
 		corners = [[width/2, height/2], [width/2, -height/2], 
 			[-width/2, -height/2], [-width/2, height/2]]
-		#close curve
-		corners.append(corners[0])
-		#convert local uvs to global points
-		points = [self.orientation.PointAt(c[0], c[1]) for c in corners]
-		#create polylinecurve
-		polyline = Rhino.Geometry.Polyline(points)
-		#get list of edge curves
-		curves = [Rhino.Geometry.LineCurve(line) for line in polyline.GetSegments()]
+		#convert local uvs to global points, reading plane's axes only once
+		o = self.orientation.Origin
+		x = self.orientation.XAxis
+		y = self.orientation.YAxis
+		points = [Rhino.Geometry.Point3d(o.X + u*x.X + v*y.X, o.Y + u*x.Y + v*y.Y,
+			o.Z + u*x.Z + v*y.Z) for u, v in corners]
+		#edge curves between consecutive corners, closing back to the first
+		curves = [Rhino.Geometry.LineCurve(points[i], points[(i + 1) % 4]) for i in range(4)]
 		#join as polycurve
 		return Rhino.Geometry.Curve.JoinCurves(curves)[0]
 		
@@ -260,9 +275,9 @@ class Post:
 		if not gcode:
 			gcode = common.Gcode()
 		
-		gcode.text += common.settings.gcode['preamble'] + "\n"
+		gcode.append(common.settings.gcode['preamble'] + "\n")
 		
-		gcode.text += "(Starting Post {0})\n".format(self.printId())
+		gcode.append("(Starting Post {0})\n".format(self.printId()))
 		
 		for p in self.pockets:
 			p.makeGcode(gcode=gcode)
@@ -7,6 +7,7 @@ Structure:
 	.joints     dictionary      dictionary of all joints in Structure (key: 'p0,p1')
 	.dim        int             number of Posts in Structure
 	.maxId		int				maximum post id
+	.connections dictionary      closest points on axes of connected posts (key: p0, then p1)
 	
 Functions:
 	.selectAxes     -       
@@ -17,13 +18,8 @@ Functions:
 
 import Rhino
 import scriptcontext as sc
-import rhinoscriptsyntax as rs
-import System.Guid
 
-from copy import deepcopy
-from copy import copy
-
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict
 
 import common
 from joint import *
@@ -33,6 +29,9 @@ class Structure:
 	"""Just one of these. This holds all information (Posts, Joints, Notches)
 		for an entire structure"""
 	
+	#maximum distance between post axes for posts to be joined
+	maxSeparation = 2
+	
 	def __init__(self):
 		"""Initialize a Structure"""
 		
@@ -103,12 +102,13 @@ class Structure:
 		else:
 			raise NameError("Unable to get line for sort axis.")
 		
-		def sortFunction(axis):
-			plane = Rhino.Geometry.Plane(sortLine.From, 
-				Rhino.Geometry.Vector3d(sortLine.To - sortLine.From))
-			return plane.DistanceTo(axis.PointAt(.5))
+		#plane normal to sort line, to measure distance along it
+		plane = Rhino.Geometry.Plane(sortLine.From, 
+			Rhino.Geometry.Vector3d(sortLine.To - sortLine.From))
 		
-		self.axes.sort(key=sortFunction)
+		#sort axes by distance of their midpoints along sort line
+		self.axes = OrderedDict(sorted(self.axes.items(),
+			key=lambda i: plane.DistanceTo(i[1].PointAt(.5))))
 	
 	def axesToPosts(self):
 		"""turn all axes in self.axes into posts"""
@@ -127,17 +127,35 @@ class Structure:
 		
 		pairs = []
 		keys = self.axes.keys()
-		
-		#loop through indeces of each Post
-		for a in range(0, self.dim):
-			#loop through all remaining Posts (higher indices)
-			for b in range(a+1, self.dim):
-				#only accept pairs within specified distance
-				if rs.Distance(*common.findClosestPoints(self.posts[keys[a]].axis, 
-					self.posts[keys[b]].axis)) < 2:
-					pairs.append((keys[a], keys[b]))
-					self.connections[keys[a]][keys[b]] = [[keys[b]]]
-					self.connections[keys[b]][keys[a]] = [[keys[a]]]
+		#post axes, by index in keys
+		axes = [self.posts[k].axis for k in keys]
+		
+		#index bounding boxes of post axes
+		tree = Rhino.Geometry.RTree()
+		for i, axis in enumerate(axes):
+			tree.Insert(axis.BoundingBox, i)
+		
+		#axes can only be within maxSeparation if their bounding boxes are
+		candidates = set()
+		def addCandidate(sender, e):
+			if e.Id != e.IdB:
+				candidates.add((min(e.Id, e.IdB), max(e.Id, e.IdB)))
+		Rhino.Geometry.RTree.SearchOverlaps(tree, tree, self.maxSeparation, addCandidate)
+		
+		for a, b in candidates:
+			#lower id first. axes may be ordered by something other than id
+			if keys[a] > keys[b]:
+				a, b = b, a
+			intersection = common.findClosestPoints(axes[a], axes[b])
+			#only accept pairs within specified distance
+			if intersection[0].DistanceTo(intersection[1]) < self.maxSeparation:
+				pairs.append((keys[a], keys[b]))
+				#keep closest points for joint, in both directions
+				self.connections[keys[a]][keys[b]] = intersection
+				self.connections[keys[b]][keys[a]] = intersection[::-1]
+		
+		#in order of ids
+		pairs.sort()
 		
 		return pairs
 	
@@ -148,9 +166,8 @@ class Structure:
 				(http://www.perlmonks.org/?node_id=522270)
 		"""
 		
-		#initialize connection matrix
-		self.connections = [[[[]] for i in range(self.maxId+1)] 
-			for j in range(self.maxId+1)]
+		#closest points between axes of each pair, by id0 then id1. only connected posts
+		self.connections = defaultdict(dict)
 		
 		#get all potential Joint pairs
 		pairs = self.findPairs()
@@ -158,65 +175,34 @@ class Structure:
 		###
 		#assign genders to pockets and make joints
 		
-		#compute the 3rd power of the adjacency matrix with our modified multiplication
-		current = deepcopy(self.connections)
+		#posts connected to each post with higher ids
+		neighbors = defaultdict(set)
+		for a, b in pairs:
+			neighbors[a].add(b)
 		
-		"""modified matrix multiplication. instead of multiplication, we
-			combine paths from i->k and k->j to get paths from i->j (this is why
-			we include the endpoint in the path, but not the starting point).
-			then instead of addition, we union all these paths from i->j
-		"""
+		#find each ring of three posts (minor figure) once, as (a, b, c) with a < b < c.
+		#pairs are in order, so rings are too - connected rings are resolved consistently
+		triangles = []
+		for a, b in pairs:
+			for c in sorted(neighbors[a] & neighbors[b]):
+				triangles.append((a, b, c))
 		
-		result1 = [[None for i in range(self.maxId+1)] for j in range(self.maxId+1)]
-		for row in range(self.maxId+1):
-			for column in range(self.maxId+1):
-				new_paths = []
-				for item in range(self.maxId+1): #connect new paths to all old paths
-					for path in current[row][item]:
-						for pathEnd in self.connections[item][column]:
-							if pathEnd and pathEnd[0] != row: #weed out A-B-A paths
-								new_paths.append(path + pathEnd)
-				result1[row][column] = new_paths
-		
-		paths = [[None for i in range(self.maxId+1)] for j in range(self.maxId+1)]
-		for row in range(self.maxId+1):
-			for column in range(self.maxId+1):
-				new_paths = []
-				for item in range(self.maxId+1): #connect new paths to all old paths
-					for path in result1[row][item]:
-						for pathEnd in self.connections[item][column]:
-							if pathEnd and len(path) == 2 and pathEnd[0] != path[-2]: #weed out A-B-C-B paths
-								new_paths.append(path + pathEnd)
-				paths[row][column] = new_paths
-		
-		#self.printPaths(paths)
 		#keep track of desired pocket genders
 		genders = {}
 		
-		for post in range(self.maxId+1):
-			for path in paths[post][post]:
-				#loop through each entry in matrix which represents a circular path of length three
-				#check for partially connected rings
-				dup = 0
-				
-				if len(path) == 3: #this post is part of a minor figure
-					for i in range(3): #loop through 3 joints in figure
-						p0 = path[i]
-						p1 = path[(i+1) % 3]
-						
-						#gender relationship is same for two joints on figure,
-						# different for the third (i == 0)
-						gender = (i != 0)
-						
-						if p0 > p1: #pair ids are not in order
-							p0,p1 = p1,p0
-							gender = not gender
-						if (p0,p1) in genders: #already decided this ring
-							dup = 1
-						else:
-							if dup == 1: #bad. two minor figures are connected but not identical
-								print "Connected rings at joint ({0}, {1})".format(p0,p1)
-							genders[(p0,p1)] = gender
+		for a, b, c in triangles:
+			#check for partially connected rings
+			dup = 0
+			
+			#gender relationship is same for two joints on figure, different for the third
+			for pair, gender in [((b, c), True), ((a, b), False), ((a, c), True)]:
+				if pair in genders: #already decided this ring
+					dup = 1
+				else:
+					if dup == 1: #bad. two minor figures are connected but not identical
+						print "Connected rings at joint ({0}, {1})".format(*pair)
+					genders[pair] = gender
+		
 		#create all joints
 		fringe = []
 		for pair in pairs:
@@ -230,25 +216,15 @@ class Structure:
 			if gender:
 				#reverse pair order to invert male/female relationship
 				pair = pair[::-1]
+			joint = Joint(self.posts[pair[0]], self.posts[pair[1]], len(self.joints),
+				pocketClass=pocketClass, intersection=self.connections[pair[0]][pair[1]])
+			
 			#create pockets for this joint
-			self.joints.append(Joint(self.posts[pair[0]], self.posts[pair[1]], len(self.joints),
-				pocketClass=pocketClass))
+			joint.build()
+			self.joints.append(joint)
 		
 		print "Joints not in a complete minor figure: \n", fringe
 	
-	def printPaths(self, connections):
-		"""the i,j entry of the matrix is a list of all the paths from i to j, but
-			without "i," at the beginning, so we must add it
-		"""
-		
-		for i,row in enumerate(connections):
-			for j,paths in enumerate(row):
-				out = '('
-				for path in paths:
-					out += str(path) + ", "
-				out = out[:-2] + ')'
-				print "{0},{1}: {2}".format(i,j,out)
-	
 	def layOut(self, postObjects=None, pocketObjects=None):
 		"""Reorient posts with pocket info to world coordinates
 		
@@ -267,23 +243,15 @@ class Structure:
 			post = self.posts[key]
 			
 			if post.isConnected:
-				transform = copy(post.globalToSelf)
-				#add offset into transformation
-				transform.M13 += offset
+				#to post's coordinates, then offset along Y
+				transform = Rhino.Geometry.Transform.Translation(0, offset, 0) * post.globalToSelf
 				
-				#start list of objects to be transformed with basic post geometry
-				guids = post.display(postObjects)
+				#geometry is transformed before it is added to the document
+				post.display(postObjects, transform)
 				
 				for pocket in post.pockets:
-					#transform geometry for each pocket
 					#objects.append(sc.doc.Objects.AddSurface(pocket.face))
-					guids.extend(pocket.display(pocketObjects))
-				for i in reversed(range(len(guids))):
-					if type(guids[i]) != System.Guid:
-						print "Removed one item of type: {0}\n".format(type(guids[i]))
-						del guids[i]
-				
-				rs.TransformObjects(guids, transform)
+					pocket.display(pocketObjects, transform)
 				
 				offset += 8*common.settings.main['globalScale']
 		
@@ -293,14 +261,14 @@ class Structure:
 		for key in self.posts:
 			post = self.posts[key]
 			
-			gcode = common.Gcode()
-			
 			f = open('gcode/{0}.nc'.format(post.printId()), 'w')
 			
+			f.write("%\n")
+			
+			#write gcode straight to file as it is made
+			gcode = common.Gcode(fp=f)
 			post.makeGcode(gcode=gcode)
 			
-			f.write("%\n")
-			f.write(gcode.text)
 			f.write("\n%")
 			
 			f.close()
@@ -11,7 +11,6 @@ import scriptcontext as sc
 import rhinoscriptsyntax as rs
 import System.Guid
 
-from copy import copy
 import math
 
 import common
@@ -26,6 +25,8 @@ class Toolpath:
 	def __init__(self):
 		"""Initialize a toolpath group"""
 		self.operations = []
+		#rotation transforms for getPath, by (A, axis)
+		self.rotations = {}
 	
 	def getPath(self, axis=False, 
 		transform=False):
@@ -39,42 +40,55 @@ class Toolpath:
 		transform = transform or Rhino.Geometry.Transform.Identity
 		
 		paths = [[]]
-		transformBase = copy(transform)
+		#Transform is a value type, and is only ever replaced below - no need to copy
+		transformBase = transform
+		#height of moves to clearance plane
+		clearance = common.settings.gcode['clearance']
 		
 		for i, o in enumerate(self.operations):
-			newPath = list(o.getPath())
+			#untransformed points - each sub-path is transformed once, when complete
+			newPath = list(o.getRawPath())
 			if o.__class__.__name__ == 'Rapid':
 				if o.A:
 					
 					if len(paths[-1]):
 						#apply transformation and move to next path
-						paths[-1] = transform.TransformList(paths[-1])
+						paths[-1] = common.transformPoints(transform, paths[-1])
 						paths.append([])
 					
 					#rotate coordinates and start new path
-					transform = transformBase * Rhino.Geometry.Transform.Rotation(o.A * math.pi/180,
-						axis.UnitTangent, axis.From)
+					transform = transformBase * self.getRotation(o.A, axis)
 					
 				elif i > 0: #only show move to clearance plane if not also rotating
 					#separate X/Y and Z movement during rapid moves 
-					clearanceV = Rhino.Geometry.Vector3d.ZAxis * common.settings.gcode['clearance']
 					
 					if o.clear:
 						#move up to clearance plan from last location
-						paths[-1].append(copy(paths[-1][-1]))
-						paths[-1][-1].Z = common.settings.gcode['clearance']
+						last = paths[-1][-1]
+						paths[-1].append(Rhino.Geometry.Point3d(last.X, last.Y, clearance))
 					
-					
-						
-					#move in X and Y first on rapid move
-					newPath.append(copy(newPath[-1]))
-					newPath[0].Z = paths[-1][-1].Z
+					#move in X and Y first on rapid move. new point, since end belongs to o
+					end = newPath[-1]
+					newPath = [Rhino.Geometry.Point3d(end.X, end.Y, paths[-1][-1].Z), end]
 				
 			paths[-1].extend(newPath)
 		
-		paths[-1] = transform.TransformList(paths[-1])
+		paths[-1] = common.transformPoints(transform, paths[-1])
 		return paths
 	
+	def getRotation(self, A, axis):
+		"""Find rotation by A degrees about axis, reusing earlier results
+		
+			Returns: Transform
+		"""
+		
+		key = (round(A, 6), axis)
+		if key not in self.rotations:
+			self.rotations[key] = Rhino.Geometry.Transform.Rotation(A * math.pi/180,
+				axis.UnitTangent, axis.From)
+		
+		return self.rotations[key]
+	
 	def extend(self, other):
 		"""concatenate two toolpath objects"""
 		
@@ -85,7 +99,7 @@ class Toolpath:
 	def display(self, transform=False, axis=False):
 		"""Add a polyline to the document showing toolpath line
 		
-		Returns: guid for added polyline
+		Returns: list of guids for added polylines, one per sub-path
 		"""
 		
 		objects = []
@@ -126,8 +140,12 @@ class Mill:
 		else:
 			self.path = []
 		
+	def getRawPath(self):
+		#return mill path, without transforming
+		return self.path
+	
 	def getPath(self, transform=Rhino.Geometry.Transform.Identity):
-		return transform.TransformList(self.path)
+		return common.transformPoints(transform, self.getRawPath())
 	
 	def info(self):
 		"""print info about this Mill path"""
@@ -151,20 +169,24 @@ class Mill:
 		
 		points = self.getPath(transform)
 		
+		precision = common.settings.gcode['precision']
 		#desired feedrate for this move
-		newFR = round(common.settings.gcode['feedrate'],common.settings.gcode['precision'])
+		newFR = round(common.settings.gcode['feedrate'], precision)
 		
+		lines = []
 		for p in points:
-			gcode.text += "X{0} Y{1} Z{2}".format(*[str(round(c, common.settings.gcode['precision']))
-				for c in [p.X, p.Y, p.Z]])
+			#%s prints floats the same as str()
+			line = "X%s Y%s Z%s" % (round(p.X, precision), round(p.Y, precision),
+				round(p.Z, precision))
 			
 			#change feedrate if necessary
 			if gcode.feedRate != newFR:
-				gcode.text += ' F{0}\n'.format(str(newFR))
+				lines.append(line + " F%s\n" % newFR)
 				gcode.feedRate = newFR
 			else:
-				gcode.text += "\n"
-			
+				lines.append(line + "\n")
+		
+		gcode.append(''.join(lines))
 		
 		return gcode
 		
@@ -192,13 +214,17 @@ class Rapid:
 		print text
 		return True
 	
+	def getRawPath(self):
+		#return rapid move path, without transforming
+		return [self.end]
+	
 	def getPath(self, transform=False):
 		#return rapid move path, after transform, adding move to clearance plane
 		
 		#default to identity transform
 		transform = transform or Rhino.Geometry.Transform.Identity
 		
-		return transform.TransformList([self.end])
+		return common.transformPoints(transform, self.getRawPath())
 	
 	def display(self, transform):
 		"""add target point to document
@@ -215,25 +241,25 @@ class Rapid:
 		
 		end = self.getPath(transform)[0]
 		
+		settings = common.settings.gcode
+		precision = settings['precision']
+		
 		#change to rapid
-		gcode.text += "G00 "
+		text = ["G00 "]
 		if self.clear:
-			gcode.text += "Z{0}\n".format(str(round(common.settings.gcode['clearance'],
-				common.settings.gcode['precision'])))
+			text.append("Z%s\n" % round(settings['clearance'], precision))
 		#rapid move X and Y
-		gcode.text += "X{0} Y{1}".format(*[str(round(c, common.settings.gcode['precision']))
-			for c in [end.X, end.Y]])
+		text.append("X%s Y%s" % (round(end.X, precision), round(end.Y, precision)))
 		if self.A is not None:
 			#negative because shopbot expects positive rotation to be CW
-			gcode.text += " {0}{1}".format(str(common.settings.gcode['rotAxis']),
-				str(-round(self.A, common.settings.gcode['precision'])))
-		gcode.text += " (Rapid Positioning)\n"
+			text.append(" %s%s" % (settings['rotAxis'], -round(self.A, precision)))
+		text.append(" (Rapid Positioning)\n")
 		#slow down to move Z
-		gcode.feedRate = round( common.settings.gcode['feedrate'] * 
-			common.settings.gcode['approach'],common.settings.gcode['precision'])
-		gcode.text += "G01 Z{1} F{0} (Linear Interpolation)\n".format(
-			str(gcode.feedRate),
-			str(round(end.Z, common.settings.gcode['precision'])))
+		gcode.feedRate = round(settings['feedrate'] * settings['approach'], precision)
+		text.append("G01 Z%s F%s (Linear Interpolation)\n" % (round(end.Z, precision),
+			gcode.feedRate))
+		
+		gcode.append(''.join(text))
 		
 		return gcode
 
@@ -257,22 +283,29 @@ class Arc:
 		self.circle = Rhino.Geometry.Circle(self.center, self.radius)
 		
 		self.arc = Rhino.Geometry.ArcCurve(self.circle, self.start, self.end)
-	
-	def getPath(self, transform=Rhino.Geometry.Transform.Identity):
-		#approximate arc with polyline
+		
+		#arc doesn't change, so approximate it with a polyline only once
 		polyline = self.arc.ToPolyline(0, 0, 
 			maxAngleRadians = math.pi / 2, maxChordLengthRatio = .2, 
 			maxAspectRatio = 0, tolerance = 0, minEdgeLength = 0.01, 
 			maxEdgeLength = 0.5, keepStartPoint = True)
 		
 		polyline = polyline.TryGetPolyline()
-		if( polyline[0]==False ): 
-			return scriptcontext.errorhandler()
-		polyline = polyline[1]
+		if not polyline[0]:
+			raise NameError("Unable to approximate arc with polyline")
+		self.points = polyline[1].ToArray()
 		
+		#for gcode: end of arc, and vector from start to center
+		self.endPoint = self.arc.PointAtEnd
+		self.moveToCenter = self.center - self.arc.PointAtStart
+	
+	def getRawPath(self):
+		#return list of points approximating arc, without transforming
+		return self.points
+	
+	def getPath(self, transform=Rhino.Geometry.Transform.Identity):
 		#return transformed list of points
-		array = polyline.ToArray()
-		return transform.TransformList(array)
+		return common.transformPoints(transform, self.getRawPath())
 	
 	def info(self):
 		"""print info about this Mill path"""
@@ -295,21 +328,19 @@ class Arc:
 			Returns: Gcode string
 		"""
 		
+		precision = common.settings.gcode['precision']
 		#desired feedrate for this move
-		newFR = round(common.settings.gcode['feedrate'],common.settings.gcode['precision'])
-		
-		moveToCenter = self.center - self.arc.PointAtStart
+		newFR = round(common.settings.gcode['feedrate'], precision)
 		
-		gcode.text += "G02 X{0} Y{1} I{2} J{3}".format(*[str(round(c, 
-			common.settings.gcode['precision'])) for c in
-			[self.arc.PointAtEnd.X, self.arc.PointAtEnd.Y, moveToCenter.X, 
-			moveToCenter.Y]])
+		line = "G02 X%s Y%s I%s J%s" % (round(self.endPoint.X, precision),
+			round(self.endPoint.Y, precision), round(self.moveToCenter.X, precision),
+			round(self.moveToCenter.Y, precision))
 			
 		#change feedrate if necessary
 		if gcode.feedRate != newFR:
-			gcode.text += ' F{0}\n'.format(str(newFR))
+			gcode.append(line + " F%s\n" % newFR)
 			gcode.feedRate = newFR
 		else:
-			gcode.text += "\n"
+			gcode.append(line + "\n")
 		
 		return gcode
\ No newline at end of file